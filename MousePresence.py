@@ -1,3 +1,5 @@
+import argparse
+import os
 import threading
 import time
 import random
@@ -7,6 +9,7 @@ from tkinter import ttk, messagebox
 import pyautogui
 from pynput import keyboard as pynput_keyboard
 from pynput import mouse as pynput_mouse
+from session_profiler import SessionProfiler, default_profile_dir
 
 def clamp(n, lo, hi):
     return max(lo, min(hi, n))
@@ -114,7 +117,7 @@ def run_one_cycle(settings, log_fn, should_stop_fn):
 
 
 class JiggleApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, profile_dir=None, profile_interval_s=60.0, profile_on_start=False):
         super().__init__()
         self.title("MousePresence Settings")
         self.geometry("1100x760")
@@ -152,6 +155,14 @@ class JiggleApp(tk.Tk):
         self._input_listeners = []
         self._start_user_input_listeners()
 
+        self.profile_dir = profile_dir or default_profile_dir()
+        self.profile_interval_s = float(profile_interval_s)
+        self.profiling_enabled = tk.BooleanVar(value=False)
+        self._profiler = None
+        self._closing_profiler = None
+        self._profiler_tick_id = None
+
+        self._build_menu()
         self._build_ui()
         self._install_traces()
         self._refresh_settings_snapshot()
@@ -161,6 +172,10 @@ class JiggleApp(tk.Tk):
 
         self.bind_all("<Escape>", lambda e: self._stop_from_ui("Escape pressed"))
 
+        if profile_on_start:
+            self.profiling_enabled.set(True)
+            self._on_profiling_toggled()
+
     def _start_user_input_listeners(self):
         try:
             kb_listener = pynput_keyboard.Listener(on_press=self._on_any_key)
@@ -232,6 +247,113 @@ class JiggleApp(tk.Tk):
         self._set_buttons_idle()
         self._log(f"Stopped by UI: {reason}")
 
+    def _build_menu(self):
+        menubar = tk.Menu(self)
+        diag = tk.Menu(menubar, tearoff=False)
+        diag.add_checkbutton(
+            label="Profiling", variable=self.profiling_enabled,
+            command=self._on_profiling_toggled
+        )
+        diag.add_command(label="Write profile report now", command=self._request_profile_report)
+        menubar.add_cascade(label="Diagnostics", menu=diag)
+        self.config(menu=menubar)
+
+    def _on_profiling_toggled(self):
+        if self.profiling_enabled.get():
+            self._start_profiling()
+        else:
+            self._stop_profiling()
+
+    def _start_profiling(self):
+        if self._profiler:
+            return
+
+        if self._closing_profiler and self._closing_profiler.is_alive():
+            self.profiling_enabled.set(False)
+            self._log("Previous profiling session is still writing its final report. Try again shortly.")
+            return
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        out_dir = os.path.abspath(os.path.join(self.profile_dir, f"session-{stamp}"))
+        try:
+            self._profiler = SessionProfiler(
+                out_dir, self._profiler_threads,
+                interval_s=self.profile_interval_s, log_fn=self._log
+            )
+            self._profiler.start()
+        except Exception as e:
+            # start() stops tracemalloc itself if it fails after enabling it.
+            self._profiler = None
+            self.profiling_enabled.set(False)
+            self._log(f"Could not start profiling: {e}")
+            return
+
+        self._profiler_tick()
+        self._log(f"Profiling enabled. Reports every {self._profiler.interval_s:g}s in {out_dir}")
+
+    def _stop_profiling(self, closing=False):
+        if self._profiler_tick_id:
+            self.after_cancel(self._profiler_tick_id)
+            self._profiler_tick_id = None
+
+        if not self._profiler:
+            return
+
+        out_dir = self._profiler.out_dir
+        if closing:
+            self._profiler.log_fn = lambda msg: None
+        self._profiler.stop()
+        self._closing_profiler = self._profiler
+        self._profiler = None
+        if not closing:
+            self._log(f"Profiling disabled. Writing final report to {out_dir}")
+
+    def wait_for_profiler(self, timeout=10.0):
+        if self._closing_profiler:
+            self._closing_profiler.join(timeout)
+
+    def _profiler_running(self):
+        if not self._profiler:
+            return False
+        if self._profiler.is_alive():
+            return True
+
+        if self._profiler_tick_id:
+            self.after_cancel(self._profiler_tick_id)
+            self._profiler_tick_id = None
+        self._closing_profiler = self._profiler
+        self._profiler = None
+        self.profiling_enabled.set(False)
+        self._log("Profiling stopped unexpectedly. See earlier log lines for the cause.")
+        return False
+
+    def _request_profile_report(self):
+        if not self._profiler_running():
+            self._log("Profiling is not enabled.")
+            return
+        self._profiler.request_report()
+        self._log("Profile report requested.")
+
+    def _profiler_tick(self):
+        self._profiler_tick_id = None
+        if not self._profiler_running():
+            return
+
+        pending = len(self.tk.splitlist(self.tk.call("after", "info")))
+        lines = int(self.log.index("end-1c").split(".")[0])
+        self._profiler.record_tk_stats(pending, lines)
+        self._profiler_tick_id = self.after(1000, self._profiler_tick)
+
+    def _profiler_threads(self):
+        threads = [(threading.main_thread(), "ui")]
+        worker = self.worker_thread
+        if worker and worker.ident:
+            threads.append((worker, "worker"))
+        for l in list(self._input_listeners):
+            if l.ident:
+                threads.append((l, "input"))
+        return threads
+
     def _build_ui(self):
         outer = ttk.Frame(self, padding=12)
         outer.pack(fill="both", expand=True)
@@ -658,9 +780,27 @@ class JiggleApp(tk.Tk):
     def _on_close(self):
         self.stop_worker()
         self._stop_user_input_listeners()
+        self._stop_profiling(closing=True)
         self.destroy()
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MousePresence")
+    parser.add_argument("--profile", action="store_true",
+                        help="enable profiling and allocation tracking at startup")
+    parser.add_argument("--profile-dir", default=default_profile_dir(),
+                        help="directory that receives profiling sessions (default: %(default)s)")
+    parser.add_argument("--profile-interval", type=float, default=60.0,
+                        help="seconds between profiling reports (default: 60)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    app = JiggleApp()
+    args = parse_args()
+    app = JiggleApp(
+        profile_dir=args.profile_dir,
+        profile_interval_s=args.profile_interval,
+        profile_on_start=args.profile,
+    )
     app.mainloop()
+    app.wait_for_profiler()
@@ -0,0 +1,281 @@
+import collections
+import ctypes
+import datetime
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+def default_profile_dir():
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "MousePresence", "profiles")
+
+
+# thread_cpu_counter(thread) returns a monotonically increasing per-thread CPU
+# counter in CPU_UNIT, or None if the thread cannot be queried. Windows uses
+# QueryThreadCycleTime because GetThreadTimes only advances at the ~15.6 ms
+# scheduler tick, which is coarser than the sampling interval.
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    _THREAD_QUERY_LIMITED_INFORMATION = 0x0800
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    _kernel32.OpenThread.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    _kernel32.OpenThread.restype = wintypes.HANDLE
+    _kernel32.QueryThreadCycleTime.argtypes = (wintypes.HANDLE, ctypes.POINTER(ctypes.c_ulonglong))
+    _kernel32.QueryThreadCycleTime.restype = wintypes.BOOL
+    _kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    _kernel32.CloseHandle.restype = wintypes.BOOL
+
+    CPU_UNIT = "cycles"
+
+    def thread_cpu_counter(thread):
+        handle = _kernel32.OpenThread(_THREAD_QUERY_LIMITED_INFORMATION, False, thread.native_id)
+        if not handle:
+            return None
+        try:
+            cycles = ctypes.c_ulonglong()
+            if not _kernel32.QueryThreadCycleTime(handle, ctypes.byref(cycles)):
+                return None
+            return cycles.value
+        finally:
+            _kernel32.CloseHandle(handle)
+
+elif hasattr(time, "pthread_getcpuclockid"):
+    CPU_UNIT = "us"
+
+    def thread_cpu_counter(thread):
+        try:
+            return time.clock_gettime_ns(time.pthread_getcpuclockid(thread.ident)) // 1000
+        except (OSError, OverflowError, TypeError):
+            return None
+
+else:
+    CPU_UNIT = "samples"
+    thread_cpu_counter = None
+
+
+class SessionProfiler:
+    SUBSYSTEMS = ("worker", "ui", "input")
+
+    def __init__(self, out_dir, classify_fn, interval_s=60.0, sample_ms=10, log_fn=None):
+        self.out_dir = out_dir
+        self.classify_fn = classify_fn
+        self.interval_s = max(1.0, float(interval_s))
+        self.sample_s = max(0.001, int(sample_ms) / 1000.0)
+        self.log_fn = log_fn or (lambda msg: None)
+
+        # Stacks are weighted by the thread's CPU counter delta (CPU_UNIT)
+        # where the platform exposes one, otherwise every sample counts as one.
+        self.cpu_weighted = thread_cpu_counter is not None
+
+        self._stop_event = threading.Event()
+        self._report_event = threading.Event()
+        self._thread = None
+        self._started_tracemalloc = False
+        self._start_ts = 0.0
+
+        self._stacks = {sub: collections.Counter() for sub in self.SUBSYSTEMS}
+        self._samples = collections.Counter()
+        self._cpu = collections.Counter()
+        self._last_cpu = {}
+
+        self._tk_lock = threading.Lock()
+        self._tk_stats = None
+
+        self._baseline = None
+        self._previous = None
+        self._report_no = 0
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._start_ts = time.time()
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        try:
+            self._baseline = self._take_snapshot()
+            self._previous = self._baseline
+            self._baseline.dump(os.path.join(self.out_dir, "tracemalloc-baseline.snapshot"))
+        except Exception:
+            self._stop_tracemalloc()
+            raise
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="SessionProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # The final report and tracemalloc shutdown happen on the profiler
+        # thread, so stopping never blocks the caller. Use join() to wait.
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def request_report(self):
+        self._report_event.set()
+
+    def record_tk_stats(self, pending_after, log_lines):
+        with self._tk_lock:
+            self._tk_stats = (time.time(), int(pending_after), int(log_lines))
+
+    def _run(self):
+        next_report = time.time() + self.interval_s
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self._sample()
+                except Exception as e:
+                    self._log(f"Profiler sampling failed, profiling stopped: {e}")
+                    break
+
+                if self._report_event.is_set() or time.time() >= next_report:
+                    self._report_event.clear()
+                    self._write_report()
+                    next_report = time.time() + self.interval_s
+
+                self._stop_event.wait(self.sample_s)
+        finally:
+            self._write_report()
+            self._stop_tracemalloc()
+            self._baseline = None
+            self._previous = None
+
+    def _log(self, msg):
+        try:
+            self.log_fn(msg)
+        except Exception:
+            pass
+
+    def _stop_tracemalloc(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _sample(self):
+        frames = sys._current_frames()
+        seen = set()
+        for thread, sub in self.classify_fn():
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            seen.add(thread.ident)
+
+            if self.cpu_weighted:
+                cpu = thread_cpu_counter(thread)
+                if cpu is None:
+                    continue
+                last = self._last_cpu.get(thread.ident)
+                self._last_cpu[thread.ident] = cpu
+                if last is None:
+                    continue
+                weight = cpu - last
+                if weight <= 0:
+                    self._samples[f"{sub}_idle"] += 1
+                    continue
+            else:
+                weight = 1
+
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+
+            # Thread bootstrap frames add nothing; for the UI thread only time
+            # spent inside a Tk callback matters, not time inside mainloop.
+            while stack and stack[0][0].co_filename == threading.__file__:
+                stack.pop(0)
+            if sub == "ui":
+                names = [code.co_name for code, _ in stack]
+                if "mainloop" in names:
+                    stack = stack[len(names) - names[::-1].index("mainloop"):]
+                if not stack:
+                    self._samples["ui_idle"] += 1
+                    continue
+
+            self._samples[sub] += 1
+            self._cpu[sub] += weight if self.cpu_weighted else 0
+            self._stacks[sub][";".join(self._frame_label(code, lineno) for code, lineno in stack)] += weight
+
+        for ident in list(self._last_cpu):
+            if ident not in seen:
+                del self._last_cpu[ident]
+
+    @staticmethod
+    def _frame_label(code, lineno):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+    @staticmethod
+    def _take_snapshot():
+        # Anything allocated with this module on the stack is the profiler's
+        # own bookkeeping (stack counters, report I/O), not the app's.
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+            tracemalloc.Filter(False, __file__, all_frames=True),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def _write_report(self):
+        try:
+            self._report_no += 1
+            now = datetime.datetime.now()
+
+            for sub, stacks in self._stacks.items():
+                path = os.path.join(self.out_dir, f"profile-{sub}.folded")
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+
+            if tracemalloc.is_tracing():
+                snapshot = self._take_snapshot()
+                snapshot.dump(os.path.join(self.out_dir, "tracemalloc-latest.snapshot"))
+                with open(os.path.join(self.out_dir, "tracemalloc-diff.txt"), "a", encoding="utf-8") as f:
+                    f.write(f"=== Report {self._report_no} at {now:%Y-%m-%d %H:%M:%S} ===\n")
+                    for title, ref in (("since start", self._baseline), ("since previous report", self._previous)):
+                        f.write(f"--- Top 20 allocation changes {title} ---\n")
+                        for stat in snapshot.compare_to(ref, "lineno")[:20]:
+                            f.write(f"{stat}\n")
+                    f.write("\n")
+                self._previous = snapshot
+                traced_current, traced_peak = tracemalloc.get_traced_memory()
+            else:
+                traced_current, traced_peak = "", ""
+
+            with self._tk_lock:
+                tk_stats = self._tk_stats
+            if tk_stats:
+                tk_age = f"{time.time() - tk_stats[0]:.1f}"
+                pending_after, log_lines = tk_stats[1], tk_stats[2]
+            else:
+                tk_age, pending_after, log_lines = "", "", ""
+
+            samples = ",".join(
+                f"{self._samples[sub]},{self._samples[sub + '_idle']},{self._cpu[sub]}"
+                for sub in self.SUBSYSTEMS
+            )
+            stats_path = os.path.join(self.out_dir, "stats.csv")
+            write_header = not os.path.exists(stats_path)
+            with open(stats_path, "a", encoding="utf-8") as f:
+                if write_header:
+                    columns = ",".join(
+                        f"samples_{sub},idle_{sub},cpu_{sub}" for sub in self.SUBSYSTEMS
+                    )
+                    f.write("timestamp,uptime_s,tk_pending_after,tk_stats_age_s,log_lines,threads,"
+                            f"traced_current_bytes,traced_peak_bytes,cpu_unit,{columns}\n")
+                f.write(
+                    f"{now:%Y-%m-%dT%H:%M:%S},{time.time() - self._start_ts:.1f},{pending_after},{tk_age},"
+                    f"{log_lines},{threading.active_count()},{traced_current},{traced_peak},{CPU_UNIT},{samples}\n"
+                )
+        except Exception as e:
+            self._log(f"Profiler report failed: {e}")